@@ -60,9 +60,9 @@ class ComponentMetricsResamplingActor:
                 then data older than `3*2 = 6` secods will be discarded when
                 creating a new sample and never passed to the resampling
                 function.
-            resampling_function: The function to be applied to the sequence of
-                *relevant* samples at a given time. The result of the function
-                is what is sent as the resampled data.
+            resampling_function: The function to be applied to the array with
+                the values of the *relevant* samples at a given time. The
+                result of the function is what is sent as the resampled data.
         """
         self._channel_registry = channel_registry
         self._resampling_period_s = resampling_period_s
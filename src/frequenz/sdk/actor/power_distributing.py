@@ -20,6 +20,7 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 from enum import Enum
 from typing import (  # pylint: disable=unused-import
+    TYPE_CHECKING,
     Any,
     Dict,
     Iterable,
@@ -32,7 +33,6 @@ from typing import (  # pylint: disable=unused-import
 
 import grpc
 from frequenz.channels import Bidirectional, Peekable, Receiver
-from google.protobuf.empty_pb2 import Empty  # pylint: disable=no-name-in-module
 
 from ..actor._decorator import actor
 from ..microgrid import ComponentGraph
@@ -45,6 +45,13 @@ from ..microgrid.component import (
 )
 from ..power import DistributionAlgorithm, InvBatPair
 
+if TYPE_CHECKING:
+    # Only needed for type annotations, importing a generated protobuf module
+    # at runtime registers descriptors which is not for free.
+    from google.protobuf.empty_pb2 import (  # pylint: disable=no-name-in-module
+        Empty,
+    )
+
 _logger = logging.getLogger(__name__)
 
 
@@ -52,6 +59,8 @@ _logger = logging.getLogger(__name__)
 class _User:
     """User definitions."""
 
+    __slots__ = ("user_id", "channel")
+
     user_id: str
     """The unique identifier for a user of the power distributing actor."""
 
@@ -63,6 +72,8 @@ class _User:
 class _BrokenComponents:
     """Store components marked as broken."""
 
+    __slots__ = ("_broken", "_timeout_sec", "_scratch_working")
+
     def __init__(self, timeout_sec: float) -> None:
         """Create object instance.
 
@@ -71,6 +82,8 @@ class _BrokenComponents:
         """
         self._broken: Dict[int, datetime] = {}
         self._timeout_sec = timeout_sec
+        # Reused by get_working_subset to not allocate a new set per call.
+        self._scratch_working: Set[int] = set()
 
     def mark_as_broken(self, component_id: int) -> None:
         """Mark component as broken.
@@ -101,9 +114,16 @@ class _BrokenComponents:
             components_ids: set of component ids
 
         Returns:
-            Subset of given components_ids with working components.
+            Subset of given components_ids with working components. The set is
+                reused between calls, so the caller must not store or mutate
+                it.
         """
-        working = set(filter(lambda cid: not self.is_broken(cid), components_ids))
+        is_broken = self.is_broken
+        working = self._scratch_working
+        working.clear()
+        for cid in components_ids:
+            if not is_broken(cid):
+                working.add(cid)
 
         if len(working) == 0:
             _logger.warning(
@@ -128,8 +148,10 @@ class _BrokenComponents:
         Returns:
             True if component is broken, False otherwise.
         """
-        if component_id in self._broken:
-            last_broken = self._broken[component_id]
+        # Single dict.get instead of a membership test followed by a lookup,
+        # this hashes the component id only once.
+        last_broken = self._broken.get(component_id)
+        if last_broken is not None:
             if (
                 datetime.now(timezone.utc) - last_broken
             ).total_seconds() < self._timeout_sec:
@@ -271,8 +293,10 @@ class PowerDistributingActor:
             component_graph: component graph of the given microgrid api.
             users_channels: BidirectionalHandle for each user. Key should be
                 user id and value should be BidirectionalHandle.
-            wait_for_data_sec: How long actor should wait before processing first
-                request. It is a time needed to collect first components data.
+            wait_for_data_sec: How long actor should wait, at most, before
+                processing first request. It is a time needed to collect first
+                components data. The actor starts earlier if all components
+                already sent some data.
         """
         self._api = microgrid_api
         self._wait_for_data_sec = wait_for_data_sec
@@ -294,6 +318,11 @@ class PowerDistributingActor:
         self._bat_inv_map, self._inv_bat_map = self._get_components_pairs(
             component_graph
         )
+        # Flat snapshot of the pairs for iteration, the dicts are kept for
+        # the by-id lookups in the request path.
+        self._bat_inv_pairs: Tuple[Tuple[int, int], ...] = tuple(
+            self._bat_inv_map.items()
+        )
         self._battery_receivers: Dict[int, Peekable[BatteryData]] = {}
         self._inverter_receivers: Dict[int, Peekable[InverterData]] = {}
 
@@ -376,10 +405,7 @@ class PowerDistributingActor:
         Every battery and inverter that failed or didn't respond in time will be marked
         as broken for some time.
         """
-        await self._create_channels()
-
-        # Wait 2 seconds to get data from the channels created above.
-        await asyncio.sleep(self._wait_for_data_sec)
+        await self._subscribe_to_components()
         self._started.set()
         while True:
             request, user = await self._request_queue.get()
@@ -441,6 +467,54 @@ class PowerDistributingActor:
                 Result(status, failed_power, distribution.remaining_power)
             )
 
+    async def _subscribe_to_components(self) -> None:
+        """Subscribe to all component data channels and wait for first data.
+
+        The wait is bounded by `self._wait_for_data_sec`; if not every
+        component sent data within that time, the actor starts anyway. The
+        receivers are converted into the peekables used by the request loop
+        only after the warm-up, the conversion invalidates the receivers
+        `_wait_for_first_data` awaits on.
+        """
+        bat_recvs, inv_recvs = await self._create_channels()
+
+        try:
+            await asyncio.wait_for(
+                self._wait_for_first_data(bat_recvs, inv_recvs),
+                timeout=self._wait_for_data_sec,
+            )
+        except asyncio.exceptions.TimeoutError:
+            _logger.warning(
+                "Not all components sent first data in %f sec. Starting anyway.",
+                self._wait_for_data_sec,
+            )
+
+        for (battery_id, inverter_id), bat_recv, inv_recv in zip(
+            self._bat_inv_pairs, bat_recvs, inv_recvs
+        ):
+            self._battery_receivers[battery_id] = bat_recv.into_peekable()
+            self._inverter_receivers[inverter_id] = inv_recv.into_peekable()
+
+    async def _wait_for_first_data(
+        self,
+        bat_recvs: List[Receiver[BatteryData]],
+        inv_recvs: List[Receiver[InverterData]],
+    ) -> None:
+        """Wait until every battery and inverter sent any data.
+
+        The messages consumed here are not lost to the request loop: it
+        reads component data through the peekables, which always expose the
+        latest value sent on a channel.
+
+        Args:
+            bat_recvs: Receivers for the battery data channels.
+            inv_recvs: Receivers for the inverter data channels.
+        """
+        await asyncio.gather(
+            *(recv.receive() for recv in bat_recvs),
+            *(recv.receive() for recv in inv_recvs),
+        )
+
     def _check_request(self, request: Request) -> Optional[Result]:
         """Check whether the given request if correct.
 
@@ -486,7 +560,6 @@ class PowerDistributingActor:
 
         while not self._request_queue.empty():
             prev_request, prev_user = self._request_queue.get_nowait()
-            # Generators seems to be the fastest
             if prev_request.batteries == batteries:
                 task = asyncio.create_task(
                     prev_user.channel.send(
@@ -494,8 +567,9 @@ class PowerDistributingActor:
                     )
                 )
                 to_ignore.append(task)
-            # Use generators as generators seems to be the fastest.
-            elif any(battery_id in prev_request.batteries for battery_id in batteries):
+            # set.isdisjoint runs as a single C-level loop, no generator
+            # frame is created per queued request.
+            elif not batteries.isdisjoint(prev_request.batteries):
                 # If that happen PowerDistributor has no way to distinguish what
                 # request is more important. This should not happen
                 _logger.error(
@@ -584,29 +658,36 @@ class PowerDistributingActor:
         bat_inv_map: Dict[int, int] = {}
         inv_bat_map: Dict[int, int] = {}
 
-        batteries: Iterable[Component] = component_graph.components(
-            component_category={ComponentCategory.BATTERY}
+        # Traverse the graph from the inverter side, this builds both maps
+        # with one successors() call per inverter instead of one
+        # predecessors() call plus a linear scan per battery.
+        inverters: Iterable[Component] = component_graph.components(
+            component_category={ComponentCategory.INVERTER}
         )
 
-        for battery in batteries:
-            inverters: List[Component] = [
-                component
-                for component in component_graph.predecessors(battery.component_id)
-                if component.category == ComponentCategory.INVERTER
-            ]
+        for inverter in inverters:
+            for successor in component_graph.successors(inverter.component_id):
+                if successor.category != ComponentCategory.BATTERY:
+                    continue
 
-            if len(inverters) == 0:
-                _logger.error("No inverters for battery %d", battery.component_id)
-                continue
+                battery_id = successor.component_id
+                if battery_id in bat_inv_map:
+                    _logger.error(
+                        "Battery %d has more then one inverter. "
+                        "It is not supported now.",
+                        battery_id,
+                    )
+                    continue
 
-            if len(inverters) > 1:
-                _logger.error(
-                    "Battery %d has more then one inverter. It is not supported now.",
-                    battery.component_id,
-                )
+                bat_inv_map[battery_id] = inverter.component_id
+                inv_bat_map[inverter.component_id] = battery_id
 
-            bat_inv_map[battery.component_id] = inverters[0].component_id
-            inv_bat_map[inverters[0].component_id] = battery.component_id
+        batteries: Iterable[Component] = component_graph.components(
+            component_category={ComponentCategory.BATTERY}
+        )
+        for battery in batteries:
+            if battery.component_id not in bat_inv_map:
+                _logger.error("No inverters for battery %d", battery.component_id)
 
         return bat_inv_map, inv_bat_map
 
@@ -624,27 +705,35 @@ class PowerDistributingActor:
         """
         pairs_data: List[InvBatPair] = []
 
+        # Bind the per-battery lookups to locals, this loop runs for every
+        # request and with many batteries the attribute walks add up.
+        bat_inv_map = self._bat_inv_map
+        battery_receivers = self._battery_receivers
+        inverter_receivers = self._inverter_receivers
+
+        # One timestamp for the whole call, taking it per component just
+        # allocates a new tz-aware datetime for every validity check.
+        now = datetime.now(timezone.utc)
+
         for battery_id in self._broken_components.get_working_subset(batteries):
-            if battery_id not in self._battery_receivers:
+            if battery_id not in battery_receivers:
                 raise KeyError(
                     f"No battery {battery_id}, "
-                    f"available batteries: {list(self._battery_receivers.keys())}"
+                    f"available batteries: {list(battery_receivers.keys())}"
                 )
 
-            inverter_id: int = self._bat_inv_map[battery_id]
+            inverter_id: int = bat_inv_map[battery_id]
 
-            battery_data: Optional[BatteryData] = self._battery_receivers[
-                battery_id
-            ].peek()
+            battery_data: Optional[BatteryData] = battery_receivers[battery_id].peek()
 
-            if not self._is_component_data_valid(battery_id, battery_data):
+            if not self._is_component_data_valid(battery_id, battery_data, now):
                 continue
 
-            inverter_data: Optional[InverterData] = self._inverter_receivers[
+            inverter_data: Optional[InverterData] = inverter_receivers[
                 inverter_id
             ].peek()
 
-            if not self._is_component_data_valid(inverter_id, inverter_data):
+            if not self._is_component_data_valid(inverter_id, inverter_data, now):
                 continue
 
             # None case already checked but mypy don't see that.
@@ -653,13 +742,17 @@ class PowerDistributingActor:
         return pairs_data
 
     def _is_component_data_valid(
-        self, component_id: int, component_data: Union[None, BatteryData, InverterData]
+        self,
+        component_id: int,
+        component_data: Union[None, BatteryData, InverterData],
+        now: datetime,
     ) -> bool:
         """Check whether the component data from microgrid are correct.
 
         Args:
             component_id: component id
             component_data: component data instance
+            now: current time, shared between the checks of a single request
 
         Returns:
             True if data are correct, false otherwise
@@ -671,7 +764,6 @@ class PowerDistributingActor:
             )
             return False
 
-        now = datetime.now(timezone.utc)
         time_delta = now - component_data.timestamp
         if time_delta.total_seconds() > self.component_data_timeout_sec:
             _logger.warning(
@@ -684,16 +776,30 @@ class PowerDistributingActor:
 
         return True
 
-    async def _create_channels(self) -> None:
-        """Create channels to get data of components in microgrid."""
-        for battery_id, inverter_id in self._bat_inv_map.items():
-            bat_recv: Receiver[BatteryData] = await self._api.battery_data(battery_id)
-            self._battery_receivers[battery_id] = bat_recv.into_peekable()
+    async def _create_channels(
+        self,
+    ) -> Tuple[List[Receiver[BatteryData]], List[Receiver[InverterData]]]:
+        """Create channels to get data of components in microgrid.
 
-            inv_recv: Receiver[InverterData] = await self._api.inverter_data(
-                inverter_id
-            )
-            self._inverter_receivers[inverter_id] = inv_recv.into_peekable()
+        Returns:
+            The battery and inverter data receivers, in `_bat_inv_pairs`
+                order. Converting them into peekables is left to the caller,
+                so it can first await the first message of every component.
+        """
+        # Subscribe to all components concurrently, issuing the requests one
+        # by one would pay one api round-trip per component.
+        pairs = self._bat_inv_pairs
+        bat_recvs: List[Receiver[BatteryData]]
+        inv_recvs: List[Receiver[InverterData]]
+        bat_recvs, inv_recvs = await asyncio.gather(
+            asyncio.gather(
+                *[self._api.battery_data(battery_id) for battery_id, _ in pairs]
+            ),
+            asyncio.gather(
+                *[self._api.inverter_data(inverter_id) for _, inverter_id in pairs]
+            ),
+        )
+        return bat_recvs, inv_recvs
 
     def _parse_result(
         self,
@@ -721,8 +827,11 @@ class PowerDistributingActor:
         any_fail: bool = False
         failed_power: int = 0
 
+        inv_bat_map = self._inv_bat_map
+        mark_as_broken = self._broken_components.mark_as_broken
+
         for inverter_id, aws in tasks.items():
-            battery_id = self._inv_bat_map[inverter_id]
+            battery_id = inv_bat_map[inverter_id]
             try:
                 aws.result()
             except grpc.aio.AioRpcError as err:
@@ -740,7 +849,7 @@ class PowerDistributingActor:
                         battery_id,
                         str(err),
                     )
-                    self._broken_components.mark_as_broken(battery_id)
+                    mark_as_broken(battery_id)
             except asyncio.exceptions.CancelledError:
                 any_fail = True
                 failed_power += distribution[inverter_id]
@@ -749,7 +858,7 @@ class PowerDistributingActor:
                     battery_id,
                     request_timeout_sec,
                 )
-                self._broken_components.mark_as_broken(battery_id)
+                mark_as_broken(battery_id)
 
         return any_fail, failed_power
 
@@ -29,6 +29,14 @@ class ComponentCategory(Enum):
     CHP = 1000002  # combined heat and power plant
 
 
+# Pre-resolved integer values of the enum members, so the conversion below is
+# a single frozenset membership test instead of a per-call generator walking
+# the enum with protobuf descriptor lookups.
+_VALID_CATEGORY_VALUES = frozenset(int(t.value) for t in ComponentCategory)
+_VALID_CATEGORIES = frozenset(ComponentCategory)
+_SENSOR_CATEGORY = int(microgrid_pb.ComponentCategory.COMPONENT_CATEGORY_SENSOR)
+
+
 def _component_category_from_protobuf(
     component_category: microgrid_pb.ComponentCategory.ValueType,
 ) -> ComponentCategory:
@@ -47,10 +55,10 @@ def _component_category_from_protobuf(
             a valid component category as it does not form part of the
             microgrid itself)
     """
-    if component_category == microgrid_pb.ComponentCategory.COMPONENT_CATEGORY_SENSOR:
+    if component_category == _SENSOR_CATEGORY:
         raise ValueError("Cannot create a component from a sensor!")
 
-    if not any(t.value == component_category for t in ComponentCategory):
+    if component_category not in _VALID_CATEGORY_VALUES:
         return ComponentCategory.NONE
 
     return ComponentCategory(component_category)
@@ -70,9 +78,9 @@ class Component:
             `True` if `id > 0` and `type` is a valid `ComponentCategory`, or if `id
                 == 0` and `type` is `GRID`, `False` otherwise
         """
-        return (
-            self.component_id > 0 and any(t == self.category for t in ComponentCategory)
-        ) or (self.component_id == 0 and self.category == ComponentCategory.GRID)
+        return (self.component_id > 0 and self.category in _VALID_CATEGORIES) or (
+            self.component_id == 0 and self.category == ComponentCategory.GRID
+        )
 
 
 class ComponentMetricId(Enum):
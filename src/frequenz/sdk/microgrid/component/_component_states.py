@@ -35,7 +35,13 @@ class EVChargerCableState(Enum):
         Returns:
             Enum value corresponding to the protobuf message.
         """
-        if not any(t.value == evc_state for t in EVChargerCableState):
+        if evc_state not in _VALID_CABLE_STATE_VALUES:
             return cls.UNSPECIFIED
 
         return EVChargerCableState(evc_state)
+
+
+# Pre-resolved integer values of the enum members, so from_pb is a single
+# frozenset membership test instead of a per-message generator with protobuf
+# descriptor lookups.
+_VALID_CABLE_STATE_VALUES = frozenset(int(t.value) for t in EVChargerCableState)
@@ -8,10 +8,10 @@ from __future__ import annotations
 import asyncio
 import logging
 import math
-from collections import deque
-from datetime import datetime, timedelta
-from typing import AsyncIterator, Callable, Coroutine, Sequence
+from datetime import datetime
+from typing import AsyncIterator, Callable, Coroutine
 
+import numpy as np
 from frequenz.channels.util import Timer
 
 from ..util.asyncio import cancel_and_await
@@ -44,13 +44,13 @@ Args:
 """
 
 
-ResamplingFunction = Callable[[Sequence[Sample], float], float]
+ResamplingFunction = Callable[[np.ndarray, float], float]
 """Resampling function type.
 
-A resampling function produces a new sample based on a list of pre-existing
-samples. It can do "upsampling" when there data rate of the `input_samples`
-period is smaller than the `resampling_period_s`, or "downsampling" if it is
-bigger.
+A resampling function produces a new sample based on the values of
+pre-existing samples. It can do "upsampling" when there data rate of the
+`input_values` period is smaller than the `resampling_period_s`, or
+"downsampling" if it is bigger.
 
 In general a resampling window is the same as the `resampling_period_s`, and
 this function might receive input samples from multiple windows in the past to
@@ -59,7 +59,8 @@ new sample that is going to be produced will always be bigger than the biggest
 timestamp in the input data).
 
 Args:
-    input_samples (Sequence[Sample]): the sequence of pre-existing samples.
+    input_values (np.ndarray): a 1-D `float64` array with the values of the
+        pre-existing samples, ordered by timestamp.
     resampling_period_s (float): the period in seconds (i.e. how ofter a new sample is
         produced.
 
@@ -69,20 +70,19 @@ Returns:
 
 
 # pylint: disable=unused-argument
-def average(samples: Sequence[Sample], resampling_period_s: float) -> float:
+def average(values: np.ndarray, resampling_period_s: float) -> float:
     """Calculate average of all the provided values.
 
     Args:
-        samples: The samples to apply the average to. It must be non-empty.
+        values: The values to apply the average to. It must be non-empty.
         resampling_period_s: The time it passes between resampled data is
             produced (in seconds).
 
     Returns:
-        The average of all `samples` values.
+        The average of all `values`.
     """
-    assert len(samples) > 0, "Average cannot be given an empty list of samples"
-    values = list(sample.value for sample in samples if sample.value is not None)
-    return sum(values) / len(values)
+    assert len(values) > 0, "Average cannot be given an empty array of values"
+    return float(values.mean())
 
 
 class SourceStoppedError(RuntimeError):
@@ -185,9 +185,9 @@ class Resampler:
                 then data older than `3*2 = 6` secods will be discarded when
                 creating a new sample and never passed to the resampling
                 function.
-            resampling_function: The function to be applied to the sequence of
-                *relevant* samples at a given time. The result of the function
-                is what is sent as the resampled data.
+            resampling_function: The function to be applied to the array with
+                the values of the *relevant* samples at a given time. The
+                result of the function is what is sent as the resampled data.
         """
         self._resampling_period_s = resampling_period_s
         self._max_data_age_in_periods: float = max_data_age_in_periods
@@ -262,32 +262,85 @@ class Resampler:
                 again).
         """
         async for timer_timestamp in self._timer:
-            results = await asyncio.gather(
-                *[r.resample(timer_timestamp) for r in self._resamplers.values()],
-                return_exceptions=True,
-            )
-            exceptions = {
-                source: results[i]
-                for i, source in enumerate(self._resamplers)
+            # Let the receiving tasks process any samples that arrived before
+            # the tick. The old per-source coroutines yielded to the event
+            # loop implicitly before touching the buffers, the synchronous
+            # computation below does not.
+            await asyncio.sleep(0)
+
+            exceptions: dict[Source, Exception | asyncio.CancelledError] = {}
+
+            # Computing the new samples is pure CPU work, so it is done
+            # synchronously in one pass and only the sending to the sinks is
+            # dispatched concurrently. The pending sends are grouped by sink,
+            # so a sink shared by several sources receives all its samples
+            # from one coroutine, and the gather is one entry per sink
+            # instead of one per source.
+            batches: dict[Sink, list[tuple[Source, _StreamingHelper, Sample]]] = {}
+            for source, helper in self._resamplers.items():
+                try:
+                    sample = helper.compute(timer_timestamp)
                 # CancelledError inherits from BaseException, but we don't want
                 # to catch *all* BaseExceptions here.
-                if isinstance(results[i], (Exception, asyncio.CancelledError))
-            }
+                except (  # pylint: disable=broad-except
+                    Exception,
+                    asyncio.CancelledError,
+                ) as error:
+                    exceptions[source] = error
+                else:
+                    batches.setdefault(helper.sink, []).append((source, helper, sample))
+
+            await asyncio.gather(
+                *[self._send_batch(batch, exceptions) for batch in batches.values()]
+            )
+
             if exceptions:
                 raise ResamplingError(exceptions)
             if one_shot:
                 break
 
+    @staticmethod
+    async def _send_batch(
+        batch: list[tuple[Source, _StreamingHelper, Sample]],
+        exceptions: dict[Source, Exception | asyncio.CancelledError],
+    ) -> None:
+        """Send a batch of computed samples sharing the same sink.
+
+        Args:
+            batch: The pending (source, helper, sample) triples to send.
+            exceptions: Mapping where errors raised by the sink are collected,
+                keyed by the source whose sample triggered them. A failed send
+                doesn't prevent the remaining samples of the batch from being
+                sent.
+        """
+        for source, helper, sample in batch:
+            try:
+                await helper.send(sample)
+            # CancelledError inherits from BaseException, but we don't want
+            # to catch *all* BaseExceptions here.
+            except (  # pylint: disable=broad-except
+                Exception,
+                asyncio.CancelledError,
+            ) as error:
+                exceptions[source] = error
+
 
 class _ResamplingHelper:
     """Keeps track of *relevant* samples to pass them to the resampling function.
 
-    Samples are stored in an internal ring buffer. All collected samples that
-    are newer than `resampling_period_s * max_data_age_in_periods` seconds are
-    considered *relevant* and are passed to the provided `resampling_function`
-    when calling the `resample()` method. All older samples are discarded.
+    Samples are stored in two parallel numpy arrays (timestamps as epoch
+    seconds and values as `float64`), so no per-sample python object is kept
+    around and the buffer can be expired and aggregated with vectorized
+    operations. All collected samples that are newer than
+    `resampling_period_s * max_data_age_in_periods` seconds are considered
+    *relevant* and their values are passed to the provided
+    `resampling_function` when calling the `resample()` method. All older
+    samples are discarded.
     """
 
+    _INITIAL_CAPACITY = 16
+    """Initial capacity of the internal arrays, doubled as needed."""
+
     def __init__(
         self,
         *,
@@ -307,46 +360,90 @@ class _ResamplingHelper:
                 then data older than 3*2 = 6 secods will be discarded when
                 creating a new sample and never passed to the resampling
                 function.
-            resampling_function: The function to be applied to the sequence of
-                relevant samples at a given time. The result of the function is
-                what is sent as the resampled data.
+            resampling_function: The function to be applied to the values of
+                the relevant samples at a given time. The result of the
+                function is what is sent as the resampled data.
         """
         self._resampling_period_s = resampling_period_s
         self._max_data_age_in_periods: float = max_data_age_in_periods
-        self._buffer: deque[Sample] = deque()
         self._resampling_function: ResamplingFunction = resampling_function
+        # Both factors are immutable, so the maximum age is computed once.
+        # It is kept as plain epoch seconds so the expiry threshold can be
+        # derived and compared in the numeric domain, without per-tick
+        # datetime/timedelta arithmetic.
+        self._max_age_s: float = max_data_age_in_periods * resampling_period_s
+        self._timestamps: np.ndarray = np.empty(
+            self._INITIAL_CAPACITY, dtype=np.float64
+        )
+        self._values: np.ndarray = np.empty(self._INITIAL_CAPACITY, dtype=np.float64)
+        self._start: int = 0
+        self._end: int = 0
 
     def add_sample(self, sample: Sample) -> None:
         """Add a new sample to the internal buffer.
 
+        Samples without a value are ignored, they carry no information for
+        the resampling function.
+
         Args:
             sample: The sample to be added to the buffer.
         """
-        self._buffer.append(sample)
-
-    def _remove_outdated_samples(self, threshold: datetime) -> None:
+        if sample.value is None:
+            return
+        end = self._end
+        if end == len(self._timestamps):
+            self._compact_or_grow()
+            end = self._end
+        self._timestamps[end] = sample.timestamp.timestamp()
+        self._values[end] = sample.value
+        self._end = end + 1
+
+    def _compact_or_grow(self) -> None:
+        """Make room at the end of the internal arrays.
+
+        If there is dead space at the front (already expired samples), the
+        live region is shifted to the front, otherwise the arrays are doubled
+        in size. Both cases are amortized O(1) per added sample.
+        """
+        start, end = self._start, self._end
+        length = end - start
+        if start > 0:
+            self._timestamps[:length] = self._timestamps[start:end]
+            self._values[:length] = self._values[start:end]
+        else:
+            capacity = max(len(self._timestamps) * 2, self._INITIAL_CAPACITY)
+            timestamps = np.empty(capacity, dtype=np.float64)
+            values = np.empty(capacity, dtype=np.float64)
+            timestamps[:length] = self._timestamps[start:end]
+            values[:length] = self._values[start:end]
+            self._timestamps = timestamps
+            self._values = values
+        self._start = 0
+        self._end = length
+
+    def _remove_outdated_samples(self, threshold_s: float) -> None:
         """Remove samples that are older than the provided time threshold.
 
         It is assumed that items in the buffer are in a sorted order (ascending order
         by timestamp).
 
-        The removal works by traversing the buffer starting from the oldest sample
-        (smallest timestamp) and comparing sample's timestamp with the threshold.
-        If the sample's threshold is smaller than `threshold`, it means that the
-        sample is outdated and it is removed from the buffer. This continues until
-        the first sample that is with timestamp greater or equal to `threshold` is
-        encountered, then buffer is considered up to date.
+        Instead of popping outdated samples one by one, the first relevant
+        sample is located with a single binary search
+        (`np.searchsorted`) and the start of the live region is advanced
+        past everything older.
 
         Args:
-            threshold: samples whose timestamp is older than the threshold are
-                considered outdated and should be remove from the buffer
+            threshold_s: samples whose timestamp (as epoch seconds) is older
+                than the threshold are considered outdated and should be
+                remove from the buffer
         """
-        while self._buffer:
-            sample: Sample = self._buffer[0]
-            if sample.timestamp > threshold:
-                return
-
-            self._buffer.popleft()
+        self._start += int(
+            np.searchsorted(
+                self._timestamps[self._start : self._end],
+                threshold_s,
+                side="right",
+            )
+        )
 
     def resample(self, timestamp: datetime) -> Sample:
         """Generate a new sample based on all the current *relevant* samples.
@@ -355,21 +452,25 @@ class _ResamplingHelper:
             timestamp: The timestamp to be used to calculate the new sample.
 
         Returns:
-            A new sample generated by calling the resampling function with all
-                the current *relevant* samples in the internal buffer, if any.
-                If there are no *relevant* samples, then the new sample will
-                have `None` as `value`.
+            A new sample generated by calling the resampling function with the
+                values of the current *relevant* samples in the internal
+                buffer, if any. If there are no *relevant* samples, then the
+                new sample will have `None` as `value`.
         """
-        threshold = timestamp - timedelta(
-            seconds=self._max_data_age_in_periods * self._resampling_period_s
+        self._remove_outdated_samples(
+            threshold_s=timestamp.timestamp() - self._max_age_s
         )
-        self._remove_outdated_samples(threshold=threshold)
 
-        value = (
-            None
-            if not self._buffer
-            else self._resampling_function(self._buffer, self._resampling_period_s)
-        )
+        if self._start == self._end:
+            return Sample(timestamp, None)
+
+        values = self._values[self._start : self._end]
+        # The default resampling function is special-cased, so the overall
+        # most common configuration doesn't pay for the indirect call.
+        if self._resampling_function is average:
+            value = float(values.mean())
+        else:
+            value = self._resampling_function(values, self._resampling_period_s)
         return Sample(timestamp, value)
 
 
@@ -396,6 +497,15 @@ class _StreamingHelper:
             self._receive_samples()
         )
 
+    @property
+    def sink(self) -> Sink:
+        """Return the sink the resampled data is sent to.
+
+        Returns:
+            The sink used to send the resampled data.
+        """
+        return self._sink
+
     async def stop(self) -> None:
         """Cancel the receiving task."""
         await cancel_and_await(self._receiving_task)
@@ -406,31 +516,36 @@ class _StreamingHelper:
         This method keeps running until the source stops (or fails with an
         error).
         """
+        # This loop runs once per incoming sample, so the globals and bound
+        # methods it needs are bound to locals once up front.
+        isnan = math.isnan
+        add_sample = self._helper.add_sample
         async for sample in self._source:
-            if sample.value is not None and not math.isnan(sample.value):
-                self._helper.add_sample(sample)
+            value = sample.value
+            if value is not None and not isnan(value):
+                add_sample(sample)
 
-    async def resample(self, timestamp: datetime) -> None:
-        """Calculate a new sample for the passed `timestamp` and send it.
+    def compute(self, timestamp: datetime) -> Sample:
+        """Calculate a new sample for the passed `timestamp`.
 
-        The helper is used to calculate the new sample and the sender is used
-        to send it.
+        This is pure CPU work, no `await`ing is involved, so many sources can
+        be computed back to back without yielding to the event loop.
 
         Args:
             timestamp: The timestamp to be used to calculate the new sample.
 
+        Returns:
+            The newly calculated sample.
+
         Raises:
             SourceStoppedError: If the source stopped sending samples.
-            Exception: if there was any error while receiving from the source
-                or sending to the sink.
+            Exception: if there was any error while receiving from the
+                source.
 
-                If the error was in the source, then this helper will stop
-                working, as the internal task to receive samples will stop due
-                to the exception. Any subsequent call to `resample()` will keep
-                raising the same exception.
-
-                If the error is in the sink, the receiving part will continue
-                working while this helper is alive.
+                In this case this helper will stop working, as the internal
+                task to receive samples will stop due to the exception. Any
+                subsequent call to `compute()` will keep raising the same
+                exception.
 
         # noqa: DAR401 recv_exception
         """
@@ -439,4 +554,12 @@ class _StreamingHelper:
                 raise recv_exception
             raise SourceStoppedError(self._source)
 
-        await self._sink(self._helper.resample(timestamp))
+        return self._helper.resample(timestamp)
+
+    async def send(self, sample: Sample) -> None:
+        """Send a previously computed sample to the sink.
+
+        Args:
+            sample: The sample to send, as returned by `compute()`.
+        """
+        await self._sink(sample)
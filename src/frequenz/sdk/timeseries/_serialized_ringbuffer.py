@@ -0,0 +1,573 @@
+# License: MIT
+# Copyright © 2022 Frequenz Energy-as-a-Service GmbH
+
+"""Ring buffer of timeseries values that can be dumped to and loaded from disk."""
+
+from __future__ import annotations
+
+import array
+import math
+import mmap
+import os
+import pickle
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather
+import pyarrow.parquet
+
+from ._base_types import Sample
+
+FloatArray = Union[List[float], np.ndarray, array.array]
+"""Type of the containers that can back a ring buffer."""
+
+
+def _to_datetime64(timestamps: Iterable[datetime]) -> np.ndarray:
+    """Convert timestamps to a `datetime64[us]` array in one numeric pass.
+
+    Args:
+        timestamps: The timestamps to convert.
+
+    Returns:
+        A `datetime64[us]` array that Arrow can turn into a timestamp
+            column without going through per-element python objects.
+    """
+    epoch_us = (
+        np.fromiter((ts.timestamp() for ts in timestamps), dtype=np.float64) * 1e6
+    )
+    return epoch_us.astype(np.int64).astype("datetime64[us]")
+
+
+@dataclass
+class Gap:
+    """A range of timestamps for which no samples were received."""
+
+    start: datetime
+    """Timestamp of the first missing sample."""
+
+    end: datetime
+    """Timestamp of the first sample after the missing range."""
+
+
+class SerializedRingbuffer:
+    """Fixed-size ring buffer of sample values, ordered by timestamp.
+
+    Each sample is stored at the index derived from its timestamp, so the
+    buffer covers a sliding window of `len(buffer) * sampling_period_s`
+    seconds. Ranges of timestamps for which no samples arrived are tracked as
+    [`Gap`][frequenz.sdk.timeseries._serialized_ringbuffer.Gap]s.
+
+    The buffer contents, the gaps and the time-window metadata can be dumped
+    to disk and loaded back using different serialization methods, see
+    [`dump()`][frequenz.sdk.timeseries._serialized_ringbuffer.SerializedRingbuffer.dump].
+    """
+
+    _METADATA_FIELDS = ("sampling_period_s", "datetime_newest", "datetime_oldest")
+    """Attributes (without the leading underscore) saved along the buffer."""
+
+    _PARQUET_SCHEMA = pa.schema(
+        [
+            ("value", pa.float64()),
+            ("gap_start", pa.timestamp("us", tz="UTC")),
+            ("gap_end", pa.timestamp("us", tz="UTC")),
+            ("sampling_period_s", pa.float64()),
+            ("datetime_newest", pa.timestamp("us", tz="UTC")),
+            ("datetime_oldest", pa.timestamp("us", tz="UTC")),
+        ]
+    )
+    """Combined schema of the single parquet file written by `dump()`.
+
+    The values, the gaps and the metadata are stored as three row groups of
+    the same file, each filling only its own columns (the rest are null).
+    """
+
+    def __init__(
+        self,
+        buffer: FloatArray,
+        sampling_period_s: float,
+        path: str,
+    ) -> None:
+        """Initialize an instance.
+
+        Args:
+            buffer: The container to store the values in. Can be a plain
+                python list, a numpy array or a packed double `array.array`
+                (which is wrapped into a numpy view), as long as it supports
+                indexed reads and writes.
+            sampling_period_s: The time between two consecutive samples (in
+                seconds).
+            path: Base path (without extension) of the files used by `dump()`
+                and `load()`.
+        """
+        # A packed double array exposes the buffer protocol, so it can be
+        # wrapped into an ndarray view for free and use the fast array code
+        # paths instead of the per-element sequence fallbacks.
+        if isinstance(buffer, array.array) and buffer.typecode == "d":
+            buffer = np.frombuffer(buffer, dtype=np.float64)
+        # Slice reads, writes and serialization all assume a C-contiguous
+        # layout; a strided or fortran-ordered array would silently turn
+        # them into stride-hopping element copies.
+        if isinstance(buffer, np.ndarray) and not buffer.flags["C_CONTIGUOUS"]:
+            buffer = np.ascontiguousarray(buffer)
+        self._buffer: FloatArray = buffer
+        self._sampling_period_s: float = sampling_period_s
+        self._path: str = path
+        self._datetime_newest: datetime | None = None
+        self._datetime_oldest: datetime | None = None
+        self._gaps: List[Gap] = []
+        # Epoch timestamp of the newest sample, kept as a plain float so the
+        # per-sample bookkeeping in update() stays scalar arithmetic.
+        self._newest_ts: float = -math.inf
+        # Whether the buffer changed since the files written by the last
+        # dump(), so periodic checkpoints of a quiescent buffer are free.
+        self._dirty: bool = True
+        self._last_dump_method: str | None = None
+
+    def __len__(self) -> int:
+        """Return the maximum number of samples the buffer can hold.
+
+        Returns:
+            The capacity of the underlying container.
+        """
+        return len(self._buffer)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        """Read values directly from the underlying container.
+
+        Args:
+            index: Index or slice into the underlying container.
+
+        Returns:
+            The value (or values, when `index` is a slice) at the given
+                position.
+        """
+        return self._buffer[index]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Collect the instance state for pickling.
+
+        The numpy values array stays in the state as-is; with pickle
+        protocol 5 it is serialized through the buffer protocol as raw
+        out-of-band memory instead of an in-stream bytes copy.
+
+        Returns:
+            The instance state, without derived attributes.
+        """
+        state = self.__dict__.copy()
+        # Derived from _datetime_newest, recomputed in __setstate__.
+        del state["_newest_ts"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore the instance state from pickled data.
+
+        Args:
+            state: The state as returned by `__getstate__()`.
+        """
+        self.__dict__.update(state)
+        self._newest_ts = (
+            self._datetime_newest.timestamp()
+            if self._datetime_newest is not None
+            else -math.inf
+        )
+
+    @property
+    def gaps(self) -> List[Gap]:
+        """Return the currently known gaps.
+
+        Returns:
+            Ranges of timestamps for which no samples were received.
+        """
+        return self._gaps
+
+    def datetime_to_index(self, timestamp: datetime) -> int:
+        """Map a timestamp to the index of its slot in the buffer.
+
+        Args:
+            timestamp: The timestamp to map.
+
+        Returns:
+            The index in the underlying container where a sample with the
+                given timestamp is stored.
+        """
+        return int(timestamp.timestamp() / self._sampling_period_s) % len(self._buffer)
+
+    def update(self, sample: Sample) -> None:
+        """Write a sample to the slot determined by its timestamp.
+
+        If the new sample is more than one sampling period newer than the
+        newest sample seen so far, the range in between is recorded as a gap.
+
+        Args:
+            sample: The sample to store.
+        """
+        timestamp = sample.timestamp
+        timestamp_s = timestamp.timestamp()
+        period_s = self._sampling_period_s
+
+        if self._newest_ts != -math.inf:
+            expected = self._newest_ts + period_s
+            if timestamp_s > expected + period_s / 2:
+                self._gaps.append(
+                    Gap(
+                        datetime.fromtimestamp(expected, tz=timestamp.tzinfo),
+                        timestamp,
+                    )
+                )
+
+        if timestamp_s > self._newest_ts:
+            self._newest_ts = timestamp_s
+            self._datetime_newest = timestamp
+        if self._datetime_oldest is None or timestamp < self._datetime_oldest:
+            self._datetime_oldest = timestamp
+
+        value = sample.value if sample.value is not None else math.nan
+        self._buffer[int(timestamp_s / period_s) % len(self._buffer)] = value
+        self._dirty = True
+
+    def update_batch(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        """Write many samples at once with vectorized index computation.
+
+        This is equivalent to calling
+        [`update()`][frequenz.sdk.timeseries._serialized_ringbuffer.SerializedRingbuffer.update]
+        for each (timestamp, value) pair, but the slot indices and the gap
+        detection are computed with bulk numpy operations instead of one
+        Python call per sample.
+
+        Args:
+            timestamps: Epoch timestamps of the samples (in seconds), sorted
+                in ascending order.
+            values: The values of the samples, same length as `timestamps`.
+        """
+        if len(timestamps) == 0:
+            return
+
+        period_s = self._sampling_period_s
+        first_ts = float(timestamps[0])
+        last_ts = float(timestamps[-1])
+
+        if self._newest_ts != -math.inf:
+            expected = self._newest_ts + period_s
+            if first_ts > expected + period_s / 2:
+                self._gaps.append(
+                    Gap(
+                        datetime.fromtimestamp(expected, tz=timezone.utc),
+                        datetime.fromtimestamp(first_ts, tz=timezone.utc),
+                    )
+                )
+
+        for position in np.nonzero(np.diff(timestamps) > 1.5 * period_s)[0]:
+            self._gaps.append(
+                Gap(
+                    datetime.fromtimestamp(
+                        float(timestamps[position]) + period_s, tz=timezone.utc
+                    ),
+                    datetime.fromtimestamp(
+                        float(timestamps[position + 1]), tz=timezone.utc
+                    ),
+                )
+            )
+
+        if last_ts > self._newest_ts:
+            self._newest_ts = last_ts
+            self._datetime_newest = datetime.fromtimestamp(last_ts, tz=timezone.utc)
+        oldest = datetime.fromtimestamp(first_ts, tz=timezone.utc)
+        if self._datetime_oldest is None or oldest < self._datetime_oldest:
+            self._datetime_oldest = oldest
+
+        indices = (np.asarray(timestamps) / period_s).astype(np.int64) % len(
+            self._buffer
+        )
+        if isinstance(self._buffer, np.ndarray):
+            self._buffer[indices] = values
+        else:
+            buffer = self._buffer
+            for index, value in zip(indices.tolist(), list(values)):
+                buffer[index] = value
+        self._dirty = True
+
+    def dump(self, method: str) -> None:
+        """Write the buffer, the gaps and the metadata to disk.
+
+        Args:
+            method: Serialization method, one of `"pickle"`, `"parquet"`,
+                `"feather"`, `"npy"` or `"mmap"`.
+
+        Raises:
+            ValueError: If `method` is not a known serialization method.
+        """
+        # Nothing changed since the last dump with this method, the files on
+        # disk are still up to date.
+        if not self._dirty and method == self._last_dump_method:
+            return
+
+        # Raw float64 samples barely compress, so compressing them only
+        # burns CPU on both the write and the read path; plain encoding
+        # without dictionaries or statistics keeps the parquet writes pure
+        # I/O.
+        parquet_options: Dict[str, Any] = {
+            "compression": None,
+            "use_dictionary": False,
+            "write_statistics": False,
+        }
+
+        if method == "pickle":
+            # Protocol 5 lets the numpy array travel as raw out-of-band
+            # memory instead of being copied into the pickle stream. The
+            # out-of-band segments go straight to the sidecar file as they
+            # are produced, without being staged in a list first.
+            #
+            # The sidecar is written to a temporary file that only replaces
+            # the old one at the end: after load("pickle") the values array
+            # is a zero-copy view into the mapping of the old sidecar, and
+            # truncating that file in place would pull the pages out from
+            # under the very array being pickled.
+            with open(f"{self._path}.pickle", "wb") as fileobj, open(
+                f"{self._path}.pickle.buffers.tmp", "wb"
+            ) as sidecar:
+
+                def write_out_of_band(out_of_band: pickle.PickleBuffer) -> None:
+                    raw = out_of_band.raw()
+                    sidecar.write(len(raw).to_bytes(8, "little"))
+                    sidecar.write(raw)
+
+                pickle.dump(
+                    self, fileobj, protocol=5, buffer_callback=write_out_of_band
+                )
+            os.replace(
+                f"{self._path}.pickle.buffers.tmp", f"{self._path}.pickle.buffers"
+            )
+        elif method == "parquet":
+            # One file, three row groups: a single open/footer/close instead
+            # of one per logical table.
+            metadata = self._metadata()
+            with pyarrow.parquet.ParquetWriter(
+                f"{self._path}.parquet", self._PARQUET_SCHEMA, **parquet_options
+            ) as writer:
+                writer.write_table(
+                    self._parquet_row_group(
+                        {"value": np.asarray(self._buffer, dtype=np.float64)},
+                        len(self._buffer),
+                    )
+                )
+                writer.write_table(
+                    self._parquet_row_group(
+                        {
+                            "gap_start": _to_datetime64(
+                                gap.start for gap in self._gaps
+                            ),
+                            "gap_end": _to_datetime64(gap.end for gap in self._gaps),
+                        },
+                        len(self._gaps),
+                    )
+                )
+                writer.write_table(
+                    self._parquet_row_group(
+                        {name: [metadata[name]] for name in self._METADATA_FIELDS}, 1
+                    )
+                )
+        elif method == "feather":
+            table = pa.Table.from_arrays(
+                [pa.array(np.asarray(self._buffer, dtype=np.float64))], names=["value"]
+            )
+            pyarrow.feather.write_feather(
+                table, f"{self._path}.feather", compression="uncompressed"
+            )
+            self._dump_sidecar()
+        elif method == "npy":
+            np.save(f"{self._path}.npy", np.asarray(self._buffer, dtype=np.float64))
+            self._dump_sidecar()
+        elif method == "mmap":
+            # Once the values live in a memory-mapped file, persisting them
+            # is just flushing the dirty pages, the kernel writes them back
+            # asynchronously anyway.
+            if not isinstance(self._buffer, np.memmap):
+                mapped = np.memmap(
+                    f"{self._path}.mmap",
+                    dtype=np.float64,
+                    mode="w+",
+                    shape=(len(self._buffer),),
+                )
+                mapped[:] = np.asarray(self._buffer, dtype=np.float64)
+                self._buffer = mapped
+            self._buffer.flush()
+            self._dump_sidecar()
+        else:
+            raise ValueError(f"Unknown serialization method: {method}")
+
+        self._dirty = False
+        self._last_dump_method = method
+
+    def load(self, method: str) -> None:
+        """Restore the buffer, the gaps and the metadata from disk.
+
+        Args:
+            method: Serialization method used by the matching `dump()` call,
+                one of `"pickle"`, `"parquet"`, `"feather"`, `"npy"` or
+                `"mmap"`.
+
+        Raises:
+            ValueError: If `method` is not a known serialization method.
+        """
+        if method == "pickle":
+            buffers = self._load_pickle_buffers()
+            with open(f"{self._path}.pickle", "rb") as fileobj:
+                loaded: SerializedRingbuffer = pickle.Unpickler(
+                    fileobj, buffers=iter(buffers)
+                ).load()
+            # Unpickler.load() returns Any, so pylint can't see that the
+            # attribute access stays within the own class.
+            # pylint: disable=protected-access
+            self._buffer = loaded._buffer
+            self._gaps = loaded._gaps
+            self._restore_metadata(loaded._metadata())
+            # pylint: enable=protected-access
+        elif method == "parquet":
+            # Memory-mapping the file lets Arrow decode straight from the
+            # page cache instead of reading the whole file into a private
+            # buffer first. Each row group is read with only its own columns.
+            pfile = pyarrow.parquet.ParquetFile(
+                f"{self._path}.parquet", memory_map=True
+            )
+            self._buffer[:] = (
+                pfile.read_row_group(0, columns=["value"])
+                .column("value")
+                .chunk(0)
+                .to_numpy(zero_copy_only=True)
+            )
+
+            gaps_table = pfile.read_row_group(1, columns=["gap_start", "gap_end"])
+            self._gaps = [
+                Gap(start, end)
+                for start, end in zip(
+                    gaps_table.column("gap_start").to_pylist(),
+                    gaps_table.column("gap_end").to_pylist(),
+                )
+            ]
+
+            meta_table = pfile.read_row_group(2, columns=list(self._METADATA_FIELDS))
+            self._restore_metadata(
+                {
+                    name: meta_table.column(name)[0].as_py()
+                    for name in self._METADATA_FIELDS
+                }
+            )
+        elif method == "feather":
+            values = (
+                pyarrow.feather.read_table(f"{self._path}.feather", memory_map=True)
+                .column("value")
+                .chunk(0)
+                .to_numpy(zero_copy_only=True)
+            )
+            self._buffer[:] = values
+            self._load_sidecar()
+        elif method == "npy":
+            values = np.load(f"{self._path}.npy", mmap_mode="r")
+            self._buffer[:] = values
+            self._load_sidecar()
+        elif method == "mmap":
+            # O(1) regardless of the buffer size, pages are faulted in on
+            # first access.
+            self._buffer = np.memmap(f"{self._path}.mmap", dtype=np.float64, mode="r+")
+            self._load_sidecar()
+        else:
+            raise ValueError(f"Unknown serialization method: {method}")
+
+        # The buffer now matches the files on disk.
+        self._dirty = False
+        self._last_dump_method = method
+
+    def _parquet_row_group(self, columns: Dict[str, Any], num_rows: int) -> pa.Table:
+        """Build a table for one row group of the combined parquet file.
+
+        Args:
+            columns: The columns this row group fills, the remaining columns
+                of the schema are padded with nulls.
+            num_rows: The number of rows of the row group.
+
+        Returns:
+            A table with the full combined schema.
+        """
+        arrays = [
+            pa.array(columns[field.name], type=field.type)
+            if field.name in columns
+            else pa.nulls(num_rows, field.type)
+            for field in self._PARQUET_SCHEMA
+        ]
+        return pa.Table.from_arrays(arrays, schema=self._PARQUET_SCHEMA)
+
+    def _load_pickle_buffers(self) -> List[memoryview]:
+        """Memory-map the out-of-band segments written by `dump("pickle")`.
+
+        Returns:
+            One writable (copy-on-write) memoryview per out-of-band buffer,
+                in the order they were written.
+        """
+        buffers: List[memoryview] = []
+        with open(f"{self._path}.pickle.buffers", "rb") as fileobj:
+            fileobj.seek(0, 2)
+            size = fileobj.tell()
+            if size == 0:
+                return buffers
+            segments = memoryview(
+                mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_COPY)
+            )
+        offset = 0
+        while offset < size:
+            length = int.from_bytes(segments[offset : offset + 8], "little")
+            offset += 8
+            buffers.append(segments[offset : offset + length])
+            offset += length
+        return buffers
+
+    def _metadata(self) -> Dict[str, Any]:
+        """Collect the metadata attributes to be serialized.
+
+        The attributes are accessed directly instead of through
+        `getattr(self, f"_{name}")`, this runs on every checkpoint.
+
+        Returns:
+            Mapping from metadata field name to its current value, with the
+                keys matching `_METADATA_FIELDS`.
+        """
+        return {
+            "sampling_period_s": self._sampling_period_s,
+            "datetime_newest": self._datetime_newest,
+            "datetime_oldest": self._datetime_oldest,
+        }
+
+    def _restore_metadata(self, metadata: Dict[str, Any]) -> None:
+        """Restore the metadata attributes from deserialized data.
+
+        Args:
+            metadata: Mapping from metadata field name to the value to restore.
+        """
+        self._sampling_period_s = metadata["sampling_period_s"]
+        self._datetime_newest = metadata["datetime_newest"]
+        self._datetime_oldest = metadata["datetime_oldest"]
+        self._newest_ts = (
+            self._datetime_newest.timestamp()
+            if self._datetime_newest is not None
+            else -math.inf
+        )
+
+    def _dump_sidecar(self) -> None:
+        """Write the gaps and the metadata to a small pickle sidecar file.
+
+        Used by the serialization methods that only store the raw values
+        array in their own format.
+        """
+        data = {"gaps": self._gaps}
+        data.update(self._metadata())
+        with open(f"{self._path}.meta.pickle", "wb") as fileobj:
+            pickle.dump(data, fileobj)
+
+    def _load_sidecar(self) -> None:
+        """Restore the gaps and the metadata from the pickle sidecar file."""
+        with open(f"{self._path}.meta.pickle", "rb") as fileobj:
+            data = pickle.load(fileobj)
+        self._gaps = data["gaps"]
+        self._restore_metadata(data)
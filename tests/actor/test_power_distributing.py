@@ -229,7 +229,10 @@ class TestPowerDistributingActor(IsolatedAsyncioTestCase):
         channel = Bidirectional[Request, Result]("user1", "power_distributor")
         with mock.patch("asyncio.sleep", new_callable=AsyncMock):
             distributor = PowerDistributingActor(
-                mock_api, component_graph, {"user1": channel.service_handle}
+                mock_api,
+                component_graph,
+                {"user1": channel.service_handle},
+                wait_for_data_sec=0.2,
             )
 
             client_handle = channel.client_handle
@@ -291,7 +294,7 @@ class TestPowerDistributingActor(IsolatedAsyncioTestCase):
 
         with mock.patch("asyncio.sleep", new_callable=AsyncMock):
             distributor = PowerDistributingActor(
-                mock_api, component_graph, service_channels
+                mock_api, component_graph, service_channels, wait_for_data_sec=0.2
             )
 
             user1_handle = channel1.client_handle
@@ -363,7 +366,7 @@ class TestPowerDistributingActor(IsolatedAsyncioTestCase):
         }
         with mock.patch("asyncio.sleep", new_callable=AsyncMock):
             distributor = PowerDistributingActor(
-                mock_api, component_graph, service_channels
+                mock_api, component_graph, service_channels, wait_for_data_sec=0.2
             )
 
             user1_handle = channel1.client_handle
@@ -426,7 +429,7 @@ class TestPowerDistributingActor(IsolatedAsyncioTestCase):
 
         with mock.patch("asyncio.sleep", new_callable=AsyncMock):
             distributor = PowerDistributingActor(
-                mock_api, component_graph, service_channels
+                mock_api, component_graph, service_channels, wait_for_data_sec=0.2
             )
 
             user1_handle = channel1.client_handle
@@ -511,7 +514,7 @@ class TestPowerDistributingActor(IsolatedAsyncioTestCase):
 
         with mock.patch("asyncio.sleep", new_callable=AsyncMock):
             distributor = PowerDistributingActor(
-                mock_api, component_graph, service_channels
+                mock_api, component_graph, service_channels, wait_for_data_sec=0.2
             )
 
             user1_handle = channel1.client_handle
@@ -573,7 +576,7 @@ class TestPowerDistributingActor(IsolatedAsyncioTestCase):
 
         with mock.patch("asyncio.sleep", new_callable=AsyncMock):
             distributor = PowerDistributingActor(
-                mock_api, component_graph, service_channels
+                mock_api, component_graph, service_channels, wait_for_data_sec=0.2
             )
 
             user1_handle = channel1.client_handle
@@ -643,7 +646,10 @@ class TestPowerDistributingActor(IsolatedAsyncioTestCase):
 
         with mock.patch("asyncio.sleep", new_callable=AsyncMock):
             distributor = PowerDistributingActor(
-                mock_api, component_graph, {"user1": channel.service_handle}
+                mock_api,
+                component_graph,
+                {"user1": channel.service_handle},
+                wait_for_data_sec=0.2,
             )
 
             client_handle = channel.client_handle
@@ -717,7 +723,10 @@ class TestPowerDistributingActor(IsolatedAsyncioTestCase):
 
         with mock.patch("asyncio.sleep", new_callable=AsyncMock):
             distributor = PowerDistributingActor(
-                mock_api, component_graph, {"user1": channel.service_handle}
+                mock_api,
+                component_graph,
+                {"user1": channel.service_handle},
+                wait_for_data_sec=0.2,
             )
 
             client_handle = channel.client_handle
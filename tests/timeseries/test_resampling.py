@@ -24,7 +24,7 @@ from frequenz.sdk.timeseries._resampling import (
     SourceStoppedError,
 )
 
-from ..utils import a_sequence
+from ..utils import an_array
 
 # pylint: disable=too-many-locals,redefined-outer-name
 
@@ -125,7 +125,7 @@ async def test_resampling_with_one_window(
         )
     )
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample1s), resampling_period_s
+        an_array(sample1s.value), resampling_period_s
     )
     sink_mock.reset_mock()
     resampling_fun_mock.reset_mock()
@@ -148,7 +148,7 @@ async def test_resampling_with_one_window(
         )
     )
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample2_5s, sample3s, sample4s), resampling_period_s
+        an_array(sample2_5s.value, sample3s.value, sample4s.value), resampling_period_s
     )
     sink_mock.reset_mock()
     resampling_fun_mock.reset_mock()
@@ -215,7 +215,7 @@ async def test_resampling_with_one_and_a_half_windows(  # pylint: disable=too-ma
         )
     )
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample0s, sample1s), resampling_period_s
+        an_array(sample0s.value, sample1s.value), resampling_period_s
     )
     sink_mock.reset_mock()
     resampling_fun_mock.reset_mock()
@@ -239,7 +239,7 @@ async def test_resampling_with_one_and_a_half_windows(  # pylint: disable=too-ma
     )
     # It should include samples in the interval (1, 4] seconds
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample2_5s, sample3s, sample4s), resampling_period_s
+        an_array(sample2_5s.value, sample3s.value, sample4s.value), resampling_period_s
     )
     sink_mock.reset_mock()
     resampling_fun_mock.reset_mock()
@@ -261,7 +261,7 @@ async def test_resampling_with_one_and_a_half_windows(  # pylint: disable=too-ma
     )
     # It should include samples in the interval (3, 6] seconds
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample4s, sample5s, sample6s), resampling_period_s
+        an_array(sample4s.value, sample5s.value, sample6s.value), resampling_period_s
     )
     sink_mock.reset_mock()
     resampling_fun_mock.reset_mock()
@@ -279,7 +279,7 @@ async def test_resampling_with_one_and_a_half_windows(  # pylint: disable=too-ma
     )
     # It should include samples in the interval (5, 8] seconds
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample6s), resampling_period_s
+        an_array(sample6s.value), resampling_period_s
     )
     sink_mock.reset_mock()
     resampling_fun_mock.reset_mock()
@@ -346,7 +346,7 @@ async def test_resampling_with_two_windows(  # pylint: disable=too-many-statemen
         )
     )
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample0s, sample1s), resampling_period_s
+        an_array(sample0s.value, sample1s.value), resampling_period_s
     )
     sink_mock.reset_mock()
     resampling_fun_mock.reset_mock()
@@ -370,7 +370,7 @@ async def test_resampling_with_two_windows(  # pylint: disable=too-many-statemen
     )
     # It should include samples in the interval (0, 4] seconds
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample1s, sample2_5s, sample3s, sample4s),
+        an_array(sample1s.value, sample2_5s.value, sample3s.value, sample4s.value),
         resampling_period_s,
     )
     sink_mock.reset_mock()
@@ -393,7 +393,13 @@ async def test_resampling_with_two_windows(  # pylint: disable=too-many-statemen
     )
     # It should include samples in the interval (2, 6] seconds
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample2_5s, sample3s, sample4s, sample5s, sample6s),
+        an_array(
+            sample2_5s.value,
+            sample3s.value,
+            sample4s.value,
+            sample5s.value,
+            sample6s.value,
+        ),
         resampling_period_s,
     )
     sink_mock.reset_mock()
@@ -412,7 +418,7 @@ async def test_resampling_with_two_windows(  # pylint: disable=too-many-statemen
     )
     # It should include samples in the interval (4, 8] seconds
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample5s, sample6s),
+        an_array(sample5s.value, sample6s.value),
         resampling_period_s,
     )
     sink_mock.reset_mock()
@@ -467,7 +473,7 @@ async def test_receiving_stopped_resampling_error(
         )
     )
     resampling_fun_mock.assert_called_once_with(
-        a_sequence(sample0s), resampling_period_s
+        an_array(sample0s.value), resampling_period_s
     )
     sink_mock.reset_mock()
     resampling_fun_mock.reset_mock()
@@ -0,0 +1,308 @@
+# License: MIT
+# Copyright © 2022 Frequenz Energy-as-a-Service GmbH
+
+"""Tests for the `SerializedRingbuffer`."""
+
+import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from frequenz.sdk.timeseries import Sample
+from frequenz.sdk.timeseries._serialized_ringbuffer import (
+    FloatArray,
+    Gap,
+    SerializedRingbuffer,
+)
+
+# pylint: disable=protected-access,redefined-outer-name
+
+ONE_MINUTE = timedelta(minutes=1)
+
+METHODS = ("pickle", "parquet", "feather", "npy")
+"""Serialization methods covered by the short roundtrip tests.
+
+The `"mmap"` method has its own test, it cannot use the shared
+overwrite-then-reload pattern.
+"""
+
+BIG_METHODS = ("npy", "parquet")
+"""Serialization methods covered with the 29-day buffer.
+
+Two memcpy-speed formats are enough to catch size-dependent regressions
+in the bulk value path; the full method matrix is covered by the short
+roundtrip test.
+"""
+
+_29_DAYS = 60 * 24 * 29
+"""Number of one-minute samples in 29 days."""
+
+
+def _make_container(kind: str, size: int) -> FloatArray:
+    """Create an empty container to back a ring buffer.
+
+    Args:
+        kind: Which container type to create, `"doubles"` for a packed
+            `array.array` or `"array"` for a numpy array.
+        size: The number of elements of the container.
+
+    Returns:
+        The container.
+    """
+    if kind == "doubles":
+        # Zero-initialized packed doubles, ~8 bytes per sample instead of
+        # a boxed python float per slot.
+        return array.array("d", bytes(8 * size))
+    return np.empty(shape=size, dtype=np.float64)
+
+
+def _fast_clone(buffer: SerializedRingbuffer) -> SerializedRingbuffer:
+    """Copy a buffer without the generic deepcopy object walk.
+
+    The values are copied with a single contiguous copy and the small
+    metadata attributes are shared or shallow-copied, which is all the
+    roundtrip tests need.
+
+    Args:
+        buffer: The buffer to copy.
+
+    Returns:
+        An independent copy of the buffer.
+    """
+    clone = SerializedRingbuffer.__new__(SerializedRingbuffer)
+    clone.__dict__.update(buffer.__dict__)
+    # Both container kinds used in these tests end up ndarray-backed, the
+    # constructor wraps packed doubles into an ndarray view.
+    assert isinstance(buffer._buffer, np.ndarray)
+    clone._buffer = buffer._buffer.copy()
+    clone._gaps = list(buffer._gaps)
+    return clone
+
+
+def fill_buffer(buffer: SerializedRingbuffer) -> None:
+    """Fill a buffer with test data.
+
+    Args:
+        buffer: The buffer to fill.
+    """
+    size = len(buffer)
+
+    # The constructor guarantees a C-contiguous ndarray layout for both
+    # container kinds used here, the vectorized fill below and the dump
+    # paths rely on it.
+    assert isinstance(buffer._buffer, np.ndarray)
+    assert buffer._buffer.flags["C_CONTIGUOUS"]
+
+    # Fill the values in one slice assignment instead of one __setitem__
+    # call per sample.
+    buffer._buffer[:] = np.arange(size, dtype=buffer._buffer.dtype)
+
+    # Write every 100th sample through the public API so the gaps and the
+    # time-window metadata get populated too, in one vectorized call
+    # instead of one update() per sample.
+    steps = np.arange(0, size, 100, dtype=np.float64)
+    buffer.update_batch(200.0 + steps * ONE_MINUTE.total_seconds(), steps)
+
+
+def load_dump_test(buffer: SerializedRingbuffer, method: str) -> None:
+    """Dump a filled buffer, overwrite it and check that load restores it.
+
+    Args:
+        buffer: The (already filled) buffer to run the dump/load roundtrip
+            on.
+        method: The serialization method to test.
+    """
+    before = _fast_clone(buffer)
+
+    buffer.dump(method)
+
+    # Overwrite everything so a successful load() is distinguishable from
+    # a no-op.
+    assert isinstance(buffer._buffer, np.ndarray)
+    buffer._buffer.fill(0)
+    assert not np.array_equal(np.asarray(buffer._buffer), np.asarray(before._buffer))
+
+    buffer.load(method)
+
+    # Compare the raw buffers at C speed instead of boxing every value
+    # into a python list first; on a mismatch this also reports the
+    # differing indices instead of a bare False.
+    np.testing.assert_array_equal(
+        np.asarray(buffer._buffer), np.asarray(before._buffer)
+    )
+    assert (
+        buffer.gaps,
+        buffer._datetime_oldest,
+        buffer._datetime_newest,
+        buffer._sampling_period_s,
+    ) == (
+        before.gaps,
+        before._datetime_oldest,
+        before._datetime_newest,
+        before._sampling_period_s,
+    )
+
+
+def test_pickle_dump_after_load(tmp_path: Path) -> None:
+    """Test that a pickle checkpoint cycle can dump again after loading.
+
+    After load("pickle") the values array is a zero-copy view into the
+    mapping of the sidecar file, so the next dump must not truncate that
+    file while it is still reading from the mapping.
+    """
+    buffer = SerializedRingbuffer(
+        np.empty(shape=256, dtype=np.float64),
+        ONE_MINUTE.total_seconds(),
+        str(tmp_path / "cycle"),
+    )
+    fill_buffer(buffer)
+
+    buffer.dump("pickle")
+    buffer.load("pickle")
+    buffer.update(Sample(datetime.fromtimestamp(1, tz=timezone.utc), 1.0))
+    buffer.dump("pickle")
+
+    before = _fast_clone(buffer)
+    buffer.load("pickle")
+    np.testing.assert_array_equal(
+        np.asarray(buffer._buffer), np.asarray(before._buffer)
+    )
+
+
+def test_dump_skips_clean_buffer(tmp_path: Path) -> None:
+    """Test that dump() skips writing when the buffer did not change."""
+    buffer = SerializedRingbuffer(
+        np.empty(shape=256, dtype=np.float64),
+        ONE_MINUTE.total_seconds(),
+        str(tmp_path / "clean"),
+    )
+    fill_buffer(buffer)
+    dumped = tmp_path / "clean.npy"
+
+    buffer.dump("npy")
+    assert dumped.exists()
+
+    # A clean buffer is not written again.
+    dumped.unlink()
+    buffer.dump("npy")
+    assert not dumped.exists()
+
+    # An update re-marks the buffer dirty.
+    buffer.update(Sample(datetime.fromtimestamp(1, tz=timezone.utc), 1.0))
+    buffer.dump("npy")
+    assert dumped.exists()
+
+    # Loading leaves the buffer clean again.
+    buffer.load("npy")
+    dumped.unlink()
+    buffer.dump("npy")
+    assert not dumped.exists()
+
+    # Dumping with another method always writes, the skip only applies to
+    # files the last dump is known to have left up to date.
+    buffer.dump("parquet")
+    assert (tmp_path / "clean.parquet").exists()
+
+
+def test_update_tracks_gaps() -> None:
+    """Test that the scalar update() stores values and records gaps."""
+    buffer = SerializedRingbuffer([0.0] * 16, 1.0, "unused")
+    buffer.update(Sample(datetime.fromtimestamp(1, tz=timezone.utc), 1.0))
+    buffer.update(Sample(datetime.fromtimestamp(2, tz=timezone.utc), 2.0))
+    buffer.update(Sample(datetime.fromtimestamp(10, tz=timezone.utc), 3.0))
+
+    assert buffer[1] == 1.0
+    assert buffer[2] == 2.0
+    assert buffer[10] == 3.0
+    assert buffer.gaps == [
+        Gap(
+            datetime.fromtimestamp(3, tz=timezone.utc),
+            datetime.fromtimestamp(10, tz=timezone.utc),
+        )
+    ]
+
+
+@pytest.fixture(scope="module", params=("doubles", "array"))
+def filled_buffer(
+    request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory
+) -> SerializedRingbuffer:
+    """Build and fill one 29-day buffer per container type.
+
+    Filling 29 days of one-minute samples is the expensive part of these
+    tests, so it runs once per container type and the tests work on cheap
+    copies.
+
+    Args:
+        request: Gives access to the container type to use.
+        tmp_path_factory: Factory for the directory the buffer dumps to.
+
+    Returns:
+        The filled buffer.
+    """
+    path = tmp_path_factory.mktemp("ringbuffer") / request.param
+    buffer = SerializedRingbuffer(
+        _make_container(request.param, _29_DAYS),
+        ONE_MINUTE.total_seconds(),
+        str(path),
+    )
+    fill_buffer(buffer)
+    return buffer
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("kind", ("doubles", "array"))
+def test_load_dump_short(tmp_path: Path, kind: str, method: str) -> None:
+    """Test the dump/load roundtrip with small list and array buffers."""
+    buffer = SerializedRingbuffer(
+        _make_container(kind, 1024),
+        ONE_MINUTE.total_seconds(),
+        str(tmp_path / f"short-{kind}"),
+    )
+    fill_buffer(buffer)
+    load_dump_test(buffer, method)
+
+
+def test_load_dump_mmap(tmp_path: Path) -> None:
+    """Test the mmap dump/load roundtrip with a second buffer instance.
+
+    `dump("mmap")` swaps the values container for a file-backed
+    `np.memmap`, so overwriting the buffer afterwards would overwrite the
+    dumped file as well. Unlike for the other methods, the roundtrip is
+    therefore checked by loading into a fresh instance.
+    """
+    path = str(tmp_path / "mapped")
+    buffer = SerializedRingbuffer(
+        _make_container("array", 1024), ONE_MINUTE.total_seconds(), path
+    )
+    fill_buffer(buffer)
+    before = _fast_clone(buffer)
+
+    buffer.dump("mmap")
+    assert isinstance(buffer._buffer, np.memmap)
+
+    restored = SerializedRingbuffer(
+        _make_container("array", 1024), ONE_MINUTE.total_seconds(), path
+    )
+    restored.load("mmap")
+    np.testing.assert_array_equal(
+        np.asarray(restored._buffer), np.asarray(before._buffer)
+    )
+    assert (
+        restored.gaps,
+        restored._datetime_oldest,
+        restored._datetime_newest,
+        restored._sampling_period_s,
+    ) == (
+        before.gaps,
+        before._datetime_oldest,
+        before._datetime_newest,
+        before._sampling_period_s,
+    )
+
+
+@pytest.mark.parametrize("method", BIG_METHODS)
+def test_load_dump(filled_buffer: SerializedRingbuffer, method: str) -> None:
+    """Test the dump/load roundtrip with 29 days of one-minute samples."""
+    load_dump_test(_fast_clone(filled_buffer), method)
@@ -4,7 +4,9 @@
 """Utilities for testing purposes."""
 
 from ._a_sequence import a_sequence
+from ._an_array import an_array
 
 __all__ = [
     "a_sequence",
+    "an_array",
 ]
@@ -0,0 +1,43 @@
+# License: MIT
+# Copyright © 2022 Frequenz Energy-as-a-Service GmbH
+
+"""Helper class to compare against a numpy array in mock assertions."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+
+# Disabling the lint because it reads easier in tests like this
+class an_array:  # pylint: disable=invalid-name
+    """Helper class to compare a numpy array against the expected values.
+
+    Examples:
+        >>> import numpy as np
+        >>> an_array(1.0, 2.0) == np.array([1.0, 2.0])
+        >>> True
+        >>> an_array(2.0, 1.0) == np.array([1.0, 2.0])
+        >>> False
+        >>> an_array(1.0) == [1.0]
+        >>> False
+    """
+
+    def __init__(self, *values: Any) -> None:
+        """Create an instance."""
+        self.values: tuple[Any, ...] = values
+
+    def __eq__(self, other: Any) -> bool:
+        """# noqa D105 (Missing docstring in magic method)."""
+        if not isinstance(other, np.ndarray):
+            return False
+        return np.array_equal(np.array(self.values, dtype=other.dtype), other)
+
+    def __str__(self) -> str:
+        """# noqa D105 (Missing docstring in magic method)."""
+        return f"{self.__class__.__name__}({', '.join(str(v) for v in self.values)})"
+
+    def __repr__(self) -> str:
+        """# noqa D105 (Missing docstring in magic method)."""
+        return f"{self.__class__.__name__}({', '.join(repr(v) for v in self.values)})"